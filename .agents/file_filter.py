@@ -1,6 +1,7 @@
 import os
 import fnmatch
 import re
+from collections import deque
 from pathlib import Path
 
 class GitIgnoreFilter:
@@ -12,6 +13,16 @@ class GitIgnoreFilter:
     def __init__(self, ignore_file_path=".agentsignore"):
         self.ignore_file_path = ignore_file_path
         self.patterns = []
+        # Memoised should_ignore decisions keyed by normalised path; directory
+        # results are reused for every entry visited beneath them
+        self._ignore_cache = {}
+        # Index of the last negation pattern; once a path is ignored by a
+        # pattern past this point no later pattern can un-ignore it
+        self._last_negation_index = -1
+        # Literal names (no globs, no slashes) from patterns past the last
+        # negation, decidable with a set lookup instead of the pattern loop
+        self._literal_dirs = frozenset()
+        self._literal_files = frozenset()
         self.load_patterns()
 
     def load_patterns(self):
@@ -31,71 +42,123 @@ class GitIgnoreFilter:
                 negated = line.startswith("!")
                 pattern = line[1:] if negated else line
 
-                self.patterns.append({
-                    "pattern": pattern,
-                    "negated": negated
-                })
+                if negated:
+                    self._last_negation_index = len(self.patterns)
 
-    def should_ignore(self, file_path):
-        """
-        Check if a file path should be ignored based on .gitignore-style patterns.
+                self.patterns.append(self._compile_pattern(pattern, negated))
 
-        Args:
-            file_path (str): Path to check (can be relative or absolute)
+        self._build_literal_fast_path()
 
-        Returns:
-            True if file should be ignored, False otherwise.
+    def _build_literal_fast_path(self):
+        """
+        Collect plain literal names ("vendor/", "node_modules", no globs or
+        slashes) from positive patterns past the last negation. Paths hitting
+        these are ignored via an O(1) set lookup, skipping the pattern loop;
+        earlier literals are excluded since a later negation could flip them.
         """
+        literal_dirs = set()
+        literal_files = set()
 
-        # Normalise path separators
-        normalized_path = file_path.replace("\\", "/")
+        for index, pattern_info in enumerate(self.patterns):
+            if pattern_info["negated"] or index <= self._last_negation_index:
+                continue
 
-        # Track the final decision (last matching pattern wins)
-        ignored = False
+            core = pattern_info["pattern"].rstrip("/")
+            if "/" in core or any(c in core for c in "*?["):
+                continue
 
-        for pattern_info in self.patterns:
-            pattern = pattern_info["pattern"]
-            negated = pattern_info["negated"]
+            if pattern_info["is_dir_only"]:
+                literal_dirs.add(core)
+            else:
+                literal_files.add(core)
 
-            if self._matches_pattern(normalized_path, pattern):
-                ignored = not negated
-        
-        return ignored
+        self._literal_dirs = frozenset(literal_dirs)
+        self._literal_files = frozenset(literal_files)
 
-    def _matches_pattern(self, path, pattern):
+    def _compile_pattern(self, pattern, negated):
         """
-        Check if a path matches a gitignore-style pattern.
+        Compile a gitignore-style pattern into a regex, done once at load time
+        so matching a path is a single re.Pattern.match call.
 
         Supports:
         - Directory patterns (ending with /)
         - Glob patterns (using **, *, ?)
         - Root-relative patterns (starting with /)
         """
+        is_dir_only = pattern.endswith("/")
+        core = pattern[:-1] if is_dir_only else pattern
 
-        # Handle directory patterns
-        if pattern.endswith("/"):
-            pattern = pattern[:-1]
-            # Match directory or anything inside it
-            if path.startswith(pattern + "/") or path == pattern:
-                return True
+        is_rooted = core.startswith("/")
+        if is_rooted:
+            core = core[1:]
+
+        # fnmatch.translate wraps its result in "(?s:...)\Z"; extract the body
+        # so anchoring for dir-only/unrooted patterns can be added around it.
+        # fnmatch's "*" already matches "/", so "**" needs no special casing.
+        body = fnmatch.translate(core)[4:-3]
+
+        # Patterns without a slash match at any depth (i.e. against the basename)
+        prefix = "(?:.*/)?" if not is_rooted and "/" not in core else ""
 
-        # Handle root-relative patterns
-        if pattern.startswith("/"):
-            pattern = pattern[1:]
-            # Only match from root
-            if path.startswith(pattern) or path == pattern:
+        # Directory patterns match the directory itself or anything inside it
+        suffix = "(?:/.*)?" if is_dir_only else ""
+
+        return {
+            "pattern": pattern,
+            "negated": negated,
+            "regex": re.compile(f"(?s:{prefix}{body}{suffix})\\Z"),
+            "is_dir_only": is_dir_only,
+            "is_rooted": is_rooted,
+        }
+
+    def should_ignore(self, file_path):
+        """
+        Check if a file path should be ignored based on .gitignore-style patterns.
+
+        Args:
+            file_path (str): Path to check (can be relative or absolute)
+
+        Returns:
+            True if file should be ignored, False otherwise.
+        """
+
+        # Normalise path separators
+        normalized_path = file_path.replace("\\", "/")
+
+        cached = self._ignore_cache.get(normalized_path)
+        if cached is not None:
+            return cached
+
+        # Fast path: literal directory/file names resolve with a set lookup
+        if self._literal_dirs or self._literal_files:
+            parts = normalized_path.split("/")
+            if parts[-1] in self._literal_files or any(
+                part in self._literal_dirs for part in parts
+            ):
+                self._ignore_cache[normalized_path] = True
                 return True
 
-        # Handle ** (matches any number of directories)
-        if "**" in pattern:
-            # Convert ** to regex equivalent
-            regex_pattern = pattern.replace("**", ".*")
-            import re
-            return bool(re.match(regex_pattern, path))
+        # Track the final decision (last matching pattern wins)
+        ignored = False
+
+        if self._last_negation_index == -1:
+            # No negation patterns: the first match decides the outcome
+            for pattern_info in self.patterns:
+                if pattern_info["regex"].match(normalized_path):
+                    ignored = True
+                    break
+        else:
+            for index, pattern_info in enumerate(self.patterns):
+                if pattern_info["regex"].match(normalized_path):
+                    ignored = not pattern_info["negated"]
+                    # Ignored past the last negation: no later pattern can flip it
+                    if ignored and index > self._last_negation_index:
+                        break
+
+        self._ignore_cache[normalized_path] = ignored
+        return ignored
+
 
-        # Use fnmatch for glob patterns
-        return fnmatch.fnmatch(path, pattern) or fnmatch.fnmatch(os.path.basename(path), pattern)
-    
     def filter_files(self, root_dir, file_extensions=None):
         """
         Walk a directory and yield files that should NOT be ignored.
@@ -107,24 +170,49 @@ class GitIgnoreFilter:
         Yields:
             Paths to files that should be processed
         """
-        root_path = Path(root_dir).resolve()
-
-        for root, dirs, files in os.walk(root_path):
-            # Filter out ignored directories
-            dirs[:] = [d for d in dirs if not self.should_ignore(
-                os.path.relpath(os.path.join(root, d), root_path).replace("\\", "/")
-            )]
-
-            for file in files:
-                file_path = os.path.join(root, file)
-                rel_path = os.path.relpath(file_path, root_path).replace("\\", "/")
+        root_path = str(Path(root_dir).resolve())
+
+        # Normalise extensions into a set once so each file is a single
+        # rpartition plus hash lookup, not a linear endswith scan
+        extensions = (
+            {ext.lstrip(".") for ext in file_extensions} if file_extensions else None
+        )
+
+        # Pending (absolute dir, relative dir) pairs; the relative dir is
+        # carried down so per-entry paths are a single concatenation rather
+        # than an os.path.relpath call
+        pending = deque([(root_path, "")])
+
+        while pending:
+            current_dir, rel_dir = pending.popleft()
+
+            try:
+                entries = os.scandir(current_dir)
+            except OSError:
+                continue
+
+            with entries:
+                for entry in entries:
+                    rel_path = f"{rel_dir}/{entry.name}" if rel_dir else entry.name
+
+                    try:
+                        is_dir = entry.is_dir(follow_symlinks=False)
+                    except OSError:
+                        continue
 
-                # Check file extension filter
-                if file_extensions:
-                    if not any(file.endswith(ext) for ext in file_extensions):
+                    # Queue non-ignored directories; never descend into ignored ones
+                    if is_dir:
+                        if not self.should_ignore(rel_path):
+                            pending.append((entry.path, rel_path))
                         continue
 
-                # Check if file should be ignored
-                if not self.should_ignore(rel_path):
-                    yield file_path
+                    # Check file extension filter
+                    if extensions is not None:
+                        _, sep, ext = entry.name.rpartition(".")
+                        if not sep or ext not in extensions:
+                            continue
+
+                    # Check if file should be ignored
+                    if not self.should_ignore(rel_path):
+                        yield entry.path
                     
\ No newline at end of file
@@ -0,0 +1,31 @@
+import json
+
+
+def extract_json_array(text):
+    """
+    Extract the first JSON array from an LLM response.
+
+    Scans for "[" candidates and parses with json.JSONDecoder.raw_decode,
+    which is linear in the response length — unlike a greedy DOTALL regex,
+    which can backtrack across the whole response on unbalanced brackets.
+
+    Args:
+        text (str): Raw LLM response text
+
+    Returns:
+        The parsed list, or None if no valid JSON array was found
+    """
+    decoder = json.JSONDecoder()
+
+    index = text.find("[")
+    while index != -1:
+        try:
+            value, _ = decoder.raw_decode(text, index)
+            if isinstance(value, list):
+                return value
+        except json.JSONDecodeError:
+            pass
+
+        index = text.find("[", index + 1)
+
+    return None
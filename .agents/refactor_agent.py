@@ -1,17 +1,19 @@
 import os
 import json
-import re
-from pathlib import Path
 
-from crewai import Agent, Task, Crew
 from dotenv import load_dotenv
 from langchain_openai import ChatOpenAI
 
+from llm_utils import extract_json_array
+
 load_dotenv()
 
 MODEL = os.getenv("MODEL", "gpt-oss:20b")
 API_BASE = os.getenv("OPENAI_API_BASE", "http://localhost:11434/v1")
 
+# Order used to surface the most important issues when distilling for prompts
+SEVERITY_RANK = {"error": 0, "warning": 1, "info": 2}
+
 
 class RefactorAgent:
     """
@@ -25,14 +27,12 @@ class RefactorAgent:
             temperature=0.2,
         )
         
-        self.agent = Agent(
-            role="PHP Refactoring Specialist",
-            goal="Identify code consolidation opportunities and suggest refactoring improvements",
-            backstory="""You are an expert PHP refactoring specialist with deep knowledge of WordPress/WooCommerce patterns.
-            You identify duplicate code, consolidation opportunities (like rb_get_layout_config pattern),
-            template structure inconsistencies, and suggest ways to improve maintainability and consistency.""",
-            llm=self.llm,
-            verbose=True,
+        # One-shot prompts don't need CrewAI's task orchestration; keep the
+        # specialist persona as a system message and call the model directly
+        self.system_prompt = (
+            "You are an expert PHP refactoring specialist with deep knowledge of WordPress/WooCommerce patterns. "
+            "You identify duplicate code, consolidation opportunities (like rb_get_layout_config pattern), "
+            "template structure inconsistencies, and suggest ways to improve maintainability and consistency."
         )
     
     def propose_refactors(self, qa_issues, codebase_path="."):
@@ -49,7 +49,25 @@ class RefactorAgent:
         # Group issues by type for better analysis
         consolidation_issues = [i for i in qa_issues if "consolidat" in i.get("issue", "").lower()]
         duplicate_code_issues = [i for i in qa_issues if "duplicate" in i.get("issue", "").lower()]
-        
+
+        # Distil the issue list Python-side rather than making the LLM
+        # re-classify everything: highest severity first, duplicates collapsed
+        # by (issue, fix) with an occurrence count, reference URLs dropped
+        distilled = {}
+        ranked = sorted(
+            qa_issues, key=lambda i: SEVERITY_RANK.get(i.get("severity"), len(SEVERITY_RANK))
+        )
+        for issue in ranked:
+            key = (issue.get("issue", ""), issue.get("fix", ""))
+            entry = distilled.get(key)
+            if entry is None:
+                entry = {k: v for k, v in issue.items() if k != "references"}
+                entry["count"] = 0
+                distilled[key] = entry
+            entry["count"] += 1
+
+        prompt_issues = list(distilled.values())[:50]  # Limit to first 50 for context
+
         prompt = f"""You are analysing a WordPress/WooCommerce codebase for refactoring opportunities.
 
 **Key Patterns to Look For:**
@@ -78,8 +96,8 @@ class RefactorAgent:
    - Inconsistent ACF field access patterns
    - Opportunities to create reusable ACF field helpers
 
-**QA Issues Found:**
-{json.dumps(qa_issues[:50], indent=2)}  # Limit to first 50 for context
+**QA Issues Found** ({len(consolidation_issues)} consolidation-related, {len(duplicate_code_issues)} duplicate-code-related; deduplicated, "count" is occurrences):
+{json.dumps(prompt_issues, separators=(",", ":"))}
 
 Analyse the codebase and provide refactoring suggestions. Return JSON array:
 
@@ -99,26 +117,17 @@ Analyse the codebase and provide refactoring suggestions. Return JSON array:
 Focus on high-impact refactorings that improve maintainability and consistency."""
 
         try:
-            task = Task(
-                description=prompt,
-                agent=self.agent,
-            )
-            
-            crew = Crew(
-                agents=[self.agent],
-                tasks=[task],
-                verbose=True,
+            response = self.llm.invoke(
+                [("system", self.system_prompt), ("user", prompt)]
             )
-            
-            result = crew.kickoff()
-            response_text = str(result)
-            
+            response_text = str(response.content)
+
             # Extract JSON from response
-            json_match = re.search(r'\[.*\]', response_text, re.DOTALL)
-            if json_match:
-                return json.loads(json_match.group(0))
-            else:
-                return json.loads(response_text)
+            suggestions = extract_json_array(response_text)
+            if suggestions is not None:
+                return suggestions
+
+            return json.loads(response_text)
         
         except json.JSONDecodeError as e:
             print(f"Warning: Could not parse refactor JSON: {e}")
@@ -1,75 +1,45 @@
 import os
+import hashlib
 import json
-import re
-from pathlib import Path
-from crewai import Agent, Task, Crew
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from dotenv import load_dotenv
 from langchain_openai import ChatOpenAI
 from file_filter import GitIgnoreFilter
+from llm_utils import extract_json_array
 
 load_dotenv()
 
 MODEL = os.getenv("MODEL", "gpt-oss:20b")
 API_BASE = os.getenv("OPENAI_API_BASE", "http://localhost:11434/v1")
 
+# Cap on files and total content per LLM call, sized to stay well inside the
+# model's context window while amortising prompt/HTTP overhead across files
+BATCH_MAX_FILES = 12
+BATCH_MAX_CHARS = 60_000
+
+# Concurrent LLM calls; the work is I/O-bound so the GIL is released while
+# waiting, but keep the pool modest to avoid overrunning the LLM server
+MAX_WORKERS = 8
+
+# Files larger than this are almost certainly generated/vendored and would
+# blow past the model's context window, so skip them instead of analysing
+MAX_FILE_BYTES = 200_000
+
+# On-disk cache of analysis results keyed by content hash, so unchanged
+# files cost zero LLM calls on subsequent runs
+CACHE_PATH = os.path.join(".agents_cache", "qa_cache.json")
+
 class StaticCodeQAAgent:
     """
     Static code QA agent that analyses PHP files for WordPress/WooCommerce best practices.
     Detects: unguarded array keys, missing sanitisation, missing rb_prefixes, and more.
     """
 
-    def __init__(self, ignored_files=None, ignore_file=".agentsignore"):
-        self.file_filter = GitIgnoreFilter(ignore_file)
-        self.llm = ChatOpenAI(
-            model=MODEL,
-            base_url=API_BASE,
-            temperature=0.1,
-        )
-        self.agent = Agent(
-            role="PHP Code Quality Analyst",
-            goal="Identify PHP code quality issues in WordPress/WooCommerce codebases following best practices",
-            backstory="""You are an expert PHP code reviewer specialising in WordPress and WooCommerce development.
-            You have deep knowledge of WordPress coding standards, security best practices, and the rb_ function prefix convention.
-            You analyse code for unguarded array access, missing sanitisation/escaping, code consolidation opportunities,
-            and adherence to WordPress/WooCommerce coding standards.""",
-            llm=self.llm,
-            verbose=True,
-        )
-    
-    def scan_php_files(self, folder):
-        """
-        Scan PHP files in the given folder and return QA issues.
-
-        Args:
-            folder (str): Root folder to scan
-
-        Return:
-            List of issue dictionaries with severity, file, line, issue, fix, and references
-        """
-        issues = []
-        php_files = list(self.file_filter.filter_files(folder, [".php"]))
-
-        print(f"Scanning {len(php_files)} PHP files...")
-
-        for file_path in php_files:
-            try:
-                with open(file_path, "r", encoding="utf-8") as f:
-                    content = f.read()
-
-                # Analyse with LLM
-                llm_issues = self._analyse_php_content(file_path, content)
-                if llm_issues:
-                    issues.extend(llm_issues)
-
-            except Exception as e:
-                print(f"Error scanning {file_path}: {e}")
-                continue
-
-        return issues
-
-    def _analyse_php_content(self, file_path, content):
-        """Use LLM to analyse PHP content for quality issues."""
-        prompt = f"""You are analysing PHP code for a WordPress/WooCommerce project. 
+    # Static prompt halves built once; keeping the prefix byte-for-byte
+    # identical across calls lets backends with prefix KV-caching skip
+    # re-prefilling it on every request
+    _PROMPT_PREFIX = """You are analysing PHP code for a WordPress/WooCommerce project.
 The codebase follows these patterns from the "after-qa" version:
 
 **Array Access Patterns:**
@@ -107,15 +77,15 @@ The codebase follows these patterns from the "after-qa" version:
 - Proper nonce verification for forms
 - Use wpdb->prepare() for database queries
 
-Analyse the following PHP code in {file_path} and identify ALL issues:
+Analyse the following PHP files and identify ALL issues. Each file starts with a `## FILE:` header:
+
+"""
 
-```php
-{content}
-```
+    _PROMPT_SUFFIX = """
 
-Return a JSON array of issues. Each issue must have:
+Return a single JSON array covering all files. Each issue must have:
 - "severity": "error" | "warning" | "info"
-- "file": "{file_path}"
+- "file": "<path from the FILE header the issue belongs to>"
 - "line": <line_number>
 - "issue": "Clear description of the problem"
 - "fix": "Specific code fix or suggestion with reasoning"
@@ -125,47 +95,233 @@ Only return valid JSON. If no issues found, return empty array [].
 
 Example format:
 [
-  {{
+  {
     "severity": "error",
     "file": "src/components/layout-example/template.php",
     "line": 45,
     "issue": "Accessing array key 'url' without isset() check",
     "fix": "Add isset() check: if ( ! isset( $link['url'] ) || ! isset( $link['title'] ) ) continue;",
     "references": ["https://developer.wordpress.org/coding-standards/wordpress-coding-standards/php/"]
-  }}
+  }
 ]
 """
 
+    def __init__(self, ignored_files=None, ignore_file=".agentsignore", cache_path=CACHE_PATH,
+                 file_filter=None):
+        # Reuse an injected filter (and its caches) rather than re-parsing
+        # the ignore file per agent
+        self.file_filter = file_filter or GitIgnoreFilter(ignore_file)
+        self.cache_path = cache_path
+        self._qa_cache = self._load_cache()
+        # Serialises console output from worker threads
+        self._print_lock = threading.Lock()
+        self.llm = ChatOpenAI(
+            model=MODEL,
+            base_url=API_BASE,
+            temperature=0.1,
+        )
+        # One-shot prompts don't need CrewAI's task orchestration; keep the
+        # reviewer persona as a system message and call the model directly
+        self.system_prompt = (
+            "You are an expert PHP code reviewer specialising in WordPress and WooCommerce development. "
+            "You have deep knowledge of WordPress coding standards, security best practices, and the rb_ function prefix convention. "
+            "You analyse code for unguarded array access, missing sanitisation/escaping, code consolidation opportunities, "
+            "and adherence to WordPress/WooCommerce coding standards."
+        )
+    
+    def scan_php_files(self, folder, on_batch=None):
+        """
+        Scan PHP files in the given folder and return QA issues.
+
+        Args:
+            folder (str): Root folder to scan
+            on_batch (callable): Optional callback invoked with each batch's
+                issues as soon as they are available, so downstream agents can
+                start work before the whole scan finishes
+
+        Return:
+            List of issue dictionaries with severity, file, line, issue, fix, and references
+        """
+        issues = []
+        php_files = list(self.file_filter.filter_files(folder, [".php"]))
+
+        print(f"Scanning {len(php_files)} PHP files...")
+
+        # Read files up front, serving unchanged ones from the content-hash
+        # cache so only cache misses reach the LLM
+        to_analyse = []
+        cache_hits = 0
+
+        for file_path in php_files:
+            try:
+                if os.path.getsize(file_path) > MAX_FILE_BYTES:
+                    print(f"Skipping {file_path}: larger than {MAX_FILE_BYTES} bytes")
+                    continue
+
+                content = self._read_file(file_path)
+            except Exception as e:
+                print(f"Error reading {file_path}: {e}")
+                continue
+
+            digest = hashlib.sha256(content.encode("utf-8")).hexdigest()
+            cached = self._qa_cache.get(digest)
+            if cached is not None:
+                issues.extend(cached)
+                cache_hits += 1
+            else:
+                to_analyse.append((file_path, content, digest))
+
+        if cache_hits:
+            print(f"Reusing cached results for {cache_hits} unchanged files")
+
+        if issues and on_batch:
+            on_batch(list(issues))
+
+        batches = list(self._batch_php_files(to_analyse))
+        if not batches:
+            return issues
+
+        # Batches are independent, so analyse them concurrently
+        with ThreadPoolExecutor(max_workers=min(MAX_WORKERS, len(batches))) as executor:
+            futures = {
+                executor.submit(
+                    self._analyse_php_batch,
+                    [(file_path, content) for file_path, content, _ in batch],
+                ): batch
+                for batch in batches
+            }
+            for future in as_completed(futures):
+                llm_issues = future.result()
+                # None signals a failed batch; don't cache that as "clean"
+                if llm_issues is None:
+                    continue
+
+                self._cache_batch_results(futures[future], llm_issues)
+                if llm_issues:
+                    issues.extend(llm_issues)
+                    if on_batch:
+                        on_batch(llm_issues)
+
+        self._save_cache()
+
+        return issues
+
+    def _batch_php_files(self, entries):
+        """
+        Group already-read files into batches for analysis, bounded by
+        BATCH_MAX_FILES and BATCH_MAX_CHARS so each batch fits one LLM call.
+
+        Args:
+            entries (list): List of (file_path, content, digest) tuples
+
+        Yields:
+            Lists of (file_path, content, digest) tuples
+        """
+        batch = []
+        batch_chars = 0
+
+        for entry in entries:
+            content = entry[1]
+
+            if batch and (
+                len(batch) >= BATCH_MAX_FILES
+                or batch_chars + len(content) > BATCH_MAX_CHARS
+            ):
+                yield batch
+                batch = []
+                batch_chars = 0
+
+            batch.append(entry)
+            batch_chars += len(content)
+
+        if batch:
+            yield batch
+
+    def _load_cache(self):
+        """Load the content-hash cache of previous analysis results."""
+        if os.path.exists(self.cache_path):
+            try:
+                with open(self.cache_path, "r", encoding="utf-8") as f:
+                    return json.load(f)
+            except Exception:
+                pass
+        return {}
+
+    def _save_cache(self):
+        """Write the content-hash cache to disk atomically."""
         try:
-            task = Task(
-                description=prompt,
-                agent=self.agent,
-            )
-            
-            crew = Crew(
-                agents=[self.agent],
-                tasks=[task],
-                verbose=True,
+            cache_dir = os.path.dirname(self.cache_path)
+            if cache_dir:
+                os.makedirs(cache_dir, exist_ok=True)
+
+            tmp_path = self.cache_path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(self._qa_cache, f)
+            os.replace(tmp_path, self.cache_path)
+        except Exception as e:
+            print(f"Warning: Could not save QA cache: {e}")
+
+    def _cache_batch_results(self, batch, llm_issues):
+        """Store a batch's issues in the cache, keyed by each file's digest."""
+        issues_by_file = {}
+        for issue in llm_issues:
+            issues_by_file.setdefault(issue.get("file", ""), []).append(issue)
+
+        for file_path, _, digest in batch:
+            self._qa_cache[digest] = issues_by_file.get(file_path, [])
+
+    @staticmethod
+    def _read_file(file_path):
+        """Read a file as UTF-8, replacing rather than raising on bad bytes."""
+        with open(file_path, "r", encoding="utf-8", errors="replace") as f:
+            return f.read()
+
+    def _analyse_php_content(self, file_path, content):
+        """Use LLM to analyse a single PHP file for quality issues."""
+        return self._analyse_php_batch([(file_path, content)]) or []
+
+    def _analyse_php_batch(self, files):
+        """
+        Use the LLM to analyse a batch of PHP files in a single call.
+
+        Args:
+            files (list): List of (file_path, content) tuples
+
+        Returns:
+            List of issue dictionaries with the "file" key set per issue,
+            or None if the batch failed
+        """
+        file_blocks = "\n\n".join(
+            f"## FILE: {file_path}\n```php\n{content}\n```"
+            for file_path, content in files
+        )
+
+        # The prefix is byte-for-byte identical across calls so an LLM
+        # backend with prefix KV-caching can reuse it
+        prompt = self._PROMPT_PREFIX + file_blocks + self._PROMPT_SUFFIX
+
+        try:
+            response = self.llm.invoke(
+                [("system", self.system_prompt), ("user", prompt)]
             )
-            
-            result = crew.kickoff()
-            
+
             # Extract JSON from response
-            response_text = str(result)
-            
-            # Try to find JSON in the response
-            json_match = re.search(r'\[.*\]', response_text, re.DOTALL)
-            if json_match:
-                return json.loads(json_match.group(0))
-            else:
-                # Try parsing the whole response
-                return json.loads(response_text)
+            response_text = str(response.content)
+
+            issues = extract_json_array(response_text)
+            if issues is not None:
+                return issues
+
+            # Try parsing the whole response
+            return json.loads(response_text)
         
         except json.JSONDecodeError as e:
-            print(f"Warning: Could not parse JSON for {file_path}: {e}")
-            print(f"Response was: {response_text[:500]}")
-            return []
+            with self._print_lock:
+                print(f"Warning: Could not parse JSON for batch of {len(files)} files: {e}")
+                print(f"Response was: {response_text[:500]}")
+            return None
         except Exception as e:
-            print(f"Error analysing {file_path}: {e}")
-            return []
+            with self._print_lock:
+                print(f"Error analysing batch of {len(files)} files: {e}")
+            return None
 
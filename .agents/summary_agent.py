@@ -1,9 +1,9 @@
 import json
 import os
+import tempfile
+from collections import defaultdict
 from datetime import datetime
-from pathlib import Path
 
-from crewai import Agent, Task, Crew
 from dotenv import load_dotenv
 from langchain_openai import ChatOpenAI
 
@@ -18,7 +18,7 @@ class SummaryAgent:
     Summary agent that compiles QA issues and refactor suggestions into a comprehensive report.
     """
     
-    def __init__(self, proposal_db="proposals.json"):
+    def __init__(self, proposal_db="proposals.jsonl"):
         self.proposal_db = proposal_db
         self.llm = ChatOpenAI(
             model=MODEL,
@@ -26,28 +26,65 @@ class SummaryAgent:
             temperature=0.1,
         )
         
-        self.agent = Agent(
-            role="QA Report Compiler",
-            goal="Compile comprehensive QA reports with severity, recommendations, and references",
-            backstory="""You are an expert technical writer specialising in code quality reports.
-            You compile QA findings into clear, actionable reports with proper severity classification,
-            prioritised recommendations, and references to documentation.""",
-            llm=self.llm,
-            verbose=True,
+        # One-shot prompts don't need CrewAI's task orchestration; keep the
+        # report-writer persona as a system message and call the model directly
+        self.system_prompt = (
+            "You are an expert technical writer specialising in code quality reports. "
+            "You compile QA findings into clear, actionable reports with proper severity classification, "
+            "prioritised recommendations, and references to documentation."
         )
         
-        # Load previous proposals
+        # Load previous proposals and index them by id for O(1) lookups
         self.proposals = self._load_proposals()
+        self._proposals_by_id = {
+            p["id"]: p for p in self.proposals.get("proposals", []) if "id" in p
+        }
+        self._rejected_ids = {
+            f"{p.get('file', '')}:{p.get('line', '')}"
+            for p in self.proposals.get("proposals", [])
+            if p.get("status") == "rejected"
+        }
     
     def _load_proposals(self):
-        """Load previous proposals from database."""
+        """Load previous proposals from the append-only JSONL database."""
         if os.path.exists(self.proposal_db):
+            proposals = []
             try:
                 with open(self.proposal_db, "r", encoding="utf-8") as f:
-                    return json.load(f)
+                    for line in f:
+                        line = line.strip()
+                        if line:
+                            proposals.append(json.loads(line))
             except Exception:
                 pass
+            return {"proposals": proposals}
+
+        # One-time migration from the legacy single-JSON database
+        legacy_path = os.path.splitext(self.proposal_db)[0] + ".json"
+        if os.path.exists(legacy_path):
+            try:
+                with open(legacy_path, "r", encoding="utf-8") as f:
+                    legacy = json.load(f)
+                self._write_all(legacy.get("proposals", []))
+                return legacy
+            except Exception:
+                pass
+
         return {"proposals": []}
+
+    def _write_all(self, proposals):
+        """Serialise the full proposal list atomically (migration/rewrites)."""
+        db_dir = os.path.dirname(self.proposal_db) or "."
+        os.makedirs(db_dir, exist_ok=True)
+
+        with tempfile.NamedTemporaryFile(
+            "w", encoding="utf-8", dir=db_dir, suffix=".tmp", delete=False
+        ) as f:
+            for entry in proposals:
+                f.write(json.dumps(entry) + "\n")
+            tmp_path = f.name
+
+        os.replace(tmp_path, self.proposal_db)
     
     def compile_report(self, qa_issues, refactor_suggestions):
         """
@@ -64,10 +101,24 @@ class SummaryAgent:
         filtered_qa = self._filter_rejected_proposals(qa_issues)
         filtered_refactors = self._filter_rejected_proposals(refactor_suggestions)
         
-        # Group issues by severity
-        errors = [i for i in filtered_qa if i.get("severity") == "error"]
-        warnings = [i for i in filtered_qa if i.get("severity") == "warning"]
-        info = [i for i in filtered_qa if i.get("severity") == "info"]
+        # Group issues by severity in a single pass
+        severity_buckets = defaultdict(list)
+        for issue in filtered_qa:
+            severity_buckets[issue.get("severity")].append(issue)
+
+        errors = severity_buckets["error"]
+        warnings = severity_buckets["warning"]
+        info = severity_buckets["info"]
+
+        # Group issues by file before prompting so the LLM doesn't spend
+        # tokens re-organising a flat list; drop reference URLs
+        prompt_qa = defaultdict(list)
+        for issue in filtered_qa[:100]:
+            prompt_qa[issue.get("file", "unknown")].append(
+                {k: v for k, v in issue.items() if k not in ("file", "references")}
+            )
+        prompt_qa = dict(prompt_qa)
+        prompt_refactors = filtered_refactors[:50]
         
         prompt = f"""Compile a comprehensive QA report in Markdown format.
 
@@ -91,27 +142,18 @@ Create a well-structured Markdown report with:
 Format the report professionally with proper headings, code blocks, and tables.
 Include specific file paths, line numbers, and actionable fixes.
 
-QA Issues:
-{json.dumps(filtered_qa[:100], indent=2)}
+QA Issues (grouped by file):
+{json.dumps(prompt_qa, separators=(",", ":"))}
 
 Refactor Suggestions:
-{json.dumps(filtered_refactors[:50], indent=2)}
+{json.dumps(prompt_refactors, separators=(",", ":"))}
 """
 
         try:
-            task = Task(
-                description=prompt,
-                agent=self.agent,
+            response = self.llm.invoke(
+                [("system", self.system_prompt), ("user", prompt)]
             )
-            
-            crew = Crew(
-                agents=[self.agent],
-                tasks=[task],
-                verbose=True,
-            )
-            
-            result = crew.kickoff()
-            markdown = str(result)
+            markdown = str(response.content)
             
             # Log proposals
             self._log_proposals(qa_issues + refactor_suggestions)
@@ -124,29 +166,20 @@ Refactor Suggestions:
     
     def _filter_rejected_proposals(self, items):
         """Filter out items that were previously rejected."""
-        rejected_ids = {
-            f"{item.get('file', '')}:{item.get('line', '')}"
-            for item in self.proposals.get("proposals", [])
-            if item.get("status") == "rejected"
-        }
-        
         return [
             item for item in items
-            if f"{item.get('file', '')}:{item.get('line', '')}" not in rejected_ids
+            if f"{item.get('file', '')}:{item.get('line', '')}" not in self._rejected_ids
         ]
     
     def _log_proposals(self, items):
         """Log proposals to avoid repeating suggestions."""
+        new_entries = []
+
         for item in items:
             proposal_id = f"{item.get('file', 'unknown')}:{item.get('line', 'unknown')}"
-            
+
             # Check if already logged
-            existing = next(
-                (p for p in self.proposals["proposals"] if p.get("id") == proposal_id),
-                None
-            )
-            
-            if not existing:
+            if proposal_id not in self._proposals_by_id:
                 entry = {
                     "id": proposal_id,
                     "file": item.get("file", ""),
@@ -156,12 +189,22 @@ Refactor Suggestions:
                     "timestamp": datetime.now().isoformat(),
                     "status": "pending"
                 }
+                self._proposals_by_id[proposal_id] = entry
                 self.proposals["proposals"].append(entry)
-        
-        # Save to file
-        os.makedirs(os.path.dirname(self.proposal_db) if os.path.dirname(self.proposal_db) else ".", exist_ok=True)
-        with open(self.proposal_db, "w", encoding="utf-8") as f:
-            json.dump(self.proposals, f, indent=2)
+                new_entries.append(entry)
+
+        if not new_entries:
+            return
+
+        # Append only the new entries — O(1) per proposal rather than
+        # rewriting the whole database each run
+        db_dir = os.path.dirname(self.proposal_db)
+        if db_dir:
+            os.makedirs(db_dir, exist_ok=True)
+
+        with open(self.proposal_db, "a", encoding="utf-8") as f:
+            for entry in new_entries:
+                f.write(json.dumps(entry) + "\n")
     
     def _fallback_report(self, qa_issues, refactor_suggestions):
         """Generate a basic report if LLM fails."""
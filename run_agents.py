@@ -1,3 +1,4 @@
+import asyncio
 import os
 import sys
 import json
@@ -10,35 +11,60 @@ agents_dir = Path(__file__).parent / ".agents"
 sys.path.insert(0, str(agents_dir))
 
 # Import agents (linter may show warning but works at runtime)
+from file_filter import GitIgnoreFilter  # type: ignore
 from static_code_qa import StaticCodeQAAgent  # type: ignore
 from refactor_agent import RefactorAgent  # type: ignore
 from summary_agent import SummaryAgent  # type: ignore
 
 load_dotenv()
 
-def main():
+async def run_pipeline():
+    # Parse .agentsignore once and share the filter across agents
+    file_filter = GitIgnoreFilter(".agentsignore")
+
     # Initialise agents
-    qa_agent = StaticCodeQAAgent(ignore_file=".agentsignore")
+    qa_agent = StaticCodeQAAgent(file_filter=file_filter)
     refactor_agent = RefactorAgent()
     summary_agent = SummaryAgent()
-    
+
     print("Starting QA scan...")
-    
-    # Run static QA
-    qa_issues = qa_agent.scan_php_files(".")
-    
+
+    # Stream finished QA batches to the refactor agent so both stages overlap
+    # instead of the refactor analysis waiting for the whole scan
+    issue_batches = asyncio.Queue()
+    loop = asyncio.get_running_loop()
+
+    def publish_batch(batch_issues):
+        # Called from the scanner's worker threads
+        loop.call_soon_threadsafe(issue_batches.put_nowait, batch_issues)
+
+    async def run_qa():
+        issues = await asyncio.to_thread(qa_agent.scan_php_files, ".", publish_batch)
+        await issue_batches.put(None)  # Sentinel: the scan is finished
+        return issues
+
+    async def run_refactors():
+        suggestions = []
+        while True:
+            batch_issues = await issue_batches.get()
+            if batch_issues is None:
+                break
+            suggestions.extend(
+                await asyncio.to_thread(refactor_agent.propose_refactors, batch_issues)
+            )
+        return suggestions
+
+    qa_issues, refactor_suggestions = await asyncio.gather(run_qa(), run_refactors())
+
     print(f"\nFound {len(qa_issues)} QA issues")
-    
-    # Run refactor suggestions
-    print("\nAnalysing refactoring opportunities...")
-    refactor_suggestions = refactor_agent.propose_refactors(qa_issues)
-    
     print(f"Found {len(refactor_suggestions)} refactoring suggestions")
-    
-    # Compile summary report
+
+    # Compile summary report (needs both stages complete)
     print("\nCompiling report...")
-    report = summary_agent.compile_report(qa_issues, refactor_suggestions)
-    
+    report = await asyncio.to_thread(
+        summary_agent.compile_report, qa_issues, refactor_suggestions
+    )
+
     # Save reports
     os.makedirs("reports", exist_ok=True)
     
@@ -57,5 +83,8 @@ def main():
     print("✅ Issues saved to reports/qa_issues.json")
     print("✅ Refactor suggestions saved to reports/refactor_suggestions.json")
 
+def main():
+    asyncio.run(run_pipeline())
+
 if __name__ == "__main__":
     main()